@@ -1,14 +1,45 @@
+import logging
 import os
+import re
+import msgspec
+import orjson
+import redis
 import requests
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+import fast_sentiment
+from circuit_breaker import CircuitOpenError
+from gemini import (
+    GEMINI_BREAKER,
+    REDIS_POOL_OPTIONS,
+    REQUEST_TIMEOUT,
+    SENTIMENT_CACHE_SIZE,
+    SENTIMENT_CACHE_TTL,
+    LRUCache,
+    gemini_body,
+    new_session,
+    record_status,
+    reply_text,
+    sentiment_cache_key,
+    system_instruction,
+)
+from json_provider import OrjsonProvider
+from log_queue import setup_logging, truncate
+from schemas import SentimentRequest, decode_request
+
 # Load environment variables from a .env file in the same directory
 load_dotenv()
 
+# Log through a background queue so writing logs never blocks a request
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # Initialize the Flask application
 app = Flask(__name__)
+# Use orjson for jsonify() and request.get_json()
+app.json = OrjsonProvider(app)
 # Enable Cross-Origin Resource Sharing (CORS) to allow your frontend
 # to make requests to this backend.
 CORS(app)
@@ -16,8 +47,16 @@ CORS(app)
 # --- Configuration ---
 # Get the Gemini API key from the environment variables
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-# Construct the correct, working URL for the Gemini API endpoint
-GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
+# Construct the correct, working URL for the Gemini API endpoint. The key is
+# sent in the x-goog-api-key header, so the URL is the same for every caller.
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+# Without an API key the API answers with mock sentiments for local testing.
+# Decided once here so requests do not re-check the environment.
+MOCK_MODE = not GEMINI_API_KEY
+# Words that make a mock sentiment "happy"
+MOCK_HAPPY_RE = re.compile(r"\b(good|great)\b", re.IGNORECASE)
+
+SESSION = new_session({"x-goog-api-key": GEMINI_API_KEY} if GEMINI_API_KEY else {})
 
 # This is the specific set of instructions we will send to the AI model
 # to ensure we only get back "happy" or "sad".
@@ -26,6 +65,66 @@ You are a highly specialized sentiment analysis model. Your only function is to
 
 Your response MUST be a single word, with no extra formatting, punctuation, or explanation. The only valid responses are the literal strings "happy" or "sad".
 """
+SYSTEM_INSTRUCTION = system_instruction(SYSTEM_PROMPT)
+
+
+def _call_gemini(message, instruction):
+    """Sends a message with a pre-serialized system instruction and returns Gemini's reply text."""
+    GEMINI_BREAKER.before_call()
+    try:
+        response = SESSION.post(GEMINI_API_URL, data=gemini_body(message, instruction), timeout=REQUEST_TIMEOUT)
+    except requests.exceptions.RequestException:
+        GEMINI_BREAKER.record_failure()
+        raise
+    except BaseException:
+        GEMINI_BREAKER.release()
+        raise
+    record_status(response.status_code)
+    # This will automatically raise an error for bad responses (like 404, 500)
+    response.raise_for_status()
+    return reply_text(response.content)
+
+
+# --- Sentiment cache ---
+# Set REDIS_HOST to share cached sentiments between gunicorn workers
+_local_sentiments = LRUCache(SENTIMENT_CACHE_SIZE)
+
+REDIS_HOST = os.getenv("REDIS_HOST")
+REDIS = redis.Redis.from_pool(redis.ConnectionPool(
+    host=REDIS_HOST,
+    port=int(os.getenv("REDIS_PORT", "6379")),
+    **REDIS_POOL_OPTIONS,
+)) if REDIS_HOST else None
+
+
+def _get_cached_sentiment(key):
+    """Returns the cached sentiment for a key, or None on a miss."""
+    sentiment = _local_sentiments.get(key)
+    if sentiment is not None or REDIS is None:
+        return sentiment
+
+    try:
+        sentiment = REDIS.get(key)
+    except redis.RedisError as e:
+        # The shared cache is an optimization, never fail the request over it
+        logger.error("Redis error reading the sentiment cache: %s", e)
+        return None
+    if sentiment is not None:
+        _local_sentiments.set(key, sentiment)
+    return sentiment
+
+
+def _cache_sentiment(key, sentiment):
+    """Stores a sentiment in this worker's cache and in Redis."""
+    _local_sentiments.set(key, sentiment)
+    if REDIS is None:
+        return
+
+    try:
+        REDIS.setex(key, SENTIMENT_CACHE_TTL, sentiment)
+    except redis.RedisError as e:
+        logger.error("Redis error writing the sentiment cache: %s", e)
+
 
 @app.route("/")
 def home():
@@ -41,56 +140,59 @@ def get_sentiment_route():
     """
     # If the API key is not set, return a mock response for local testing.
     # This prevents unnecessary API calls and avoids rate-limiting issues.
-    if not GEMINI_API_KEY:
-        print("Warning: GEMINI_API_KEY not found. Returning a mock sentiment.")
+    if MOCK_MODE:
+        logger.warning("GEMINI_API_KEY not found. Returning a mock sentiment.")
         # Simple logic for the mock response
-        mock_message = request.get_json().get('message', '').lower()
-        sentiment = "happy" if "good" in mock_message or "great" in mock_message else "sad"
+        mock_message = request.get_json().get('message', '')
+        sentiment = "happy" if MOCK_HAPPY_RE.search(mock_message) else "sad"
         return jsonify({'sentiment': sentiment})
 
-    # Get the JSON data from the incoming POST request
-    data = request.get_json()
-    if not data or 'message' not in data:
+    # Parse and validate the JSON body of the incoming POST request
+    try:
+        req = decode_request(request.get_data(), SentimentRequest)
+    except msgspec.DecodeError:
         return jsonify({'error': 'Message is required in the request body'}), 400
 
-    user_message = data['message']
+    user_message = req.message
+
+    # Obvious cases are answered locally without a Gemini call
+    sentiment = fast_sentiment.classify(user_message)
+    if sentiment is not None:
+        return jsonify({'sentiment': sentiment})
+
+    cache_key = sentiment_cache_key(SYSTEM_PROMPT, user_message)
+    sentiment = _get_cached_sentiment(cache_key)
+    if sentiment is not None:
+        return jsonify({'sentiment': sentiment})
 
     try:
-        # This is the data structure (payload) the Gemini API expects.
-        # It includes our system prompt to control the output.
-        payload = {
-            "contents": [{"parts": [{"text": user_message}]}],
-            "systemInstruction": {"parts": [{"text": SYSTEM_PROMPT}]}
-        }
-        
-        # Make the POST request to the Gemini API
-        response = requests.post(GEMINI_API_URL, json=payload)
-        # This will automatically raise an error for bad responses (like 404, 500)
-        response.raise_for_status()
-
-        response_data = response.json()
-        
-        # Carefully extract the single word response from the complex JSON structure
-        sentiment = response_data['candidates'][0]['content']['parts'][0]['text'].strip().lower()
+        # Ask Gemini with our system prompt, which limits the reply to a single word
+        sentiment = _call_gemini(user_message, SYSTEM_INSTRUCTION).strip().lower()
+        # Only remember well-formed answers so a stray reply is not served forever
+        if sentiment in ("happy", "sad"):
+            _cache_sentiment(cache_key, sentiment)
 
         # Return the clean sentiment to the frontend
         return jsonify({'sentiment': sentiment})
 
+    except CircuitOpenError:
+        # Gemini keeps failing, answer right away with a neutral fallback
+        return jsonify({'error': 'The sentiment analysis service is temporarily unavailable', 'sentiment': 'happy'}), 503
     except requests.exceptions.HTTPError as e:
         # Handle specific errors from the API, like rate limiting (429) or auth issues (403)
-        print(f"HTTP Error calling Gemini API: {e.response.text}")
+        logger.error("HTTP Error calling Gemini API: %s", truncate(e.response.text))
         return jsonify({'error': f'API request failed with status {e.response.status_code}'}), e.response.status_code
-    except (KeyError, IndexError):
+    except (KeyError, IndexError, orjson.JSONDecodeError) as e:
         # Handle cases where the response from Gemini is not what we expect
-        print(f"Error parsing Gemini API response: {response_data}")
+        logger.error("Error parsing Gemini API response: %r", e)
         return jsonify({'error': 'Invalid response structure from sentiment service'}), 500
     except requests.exceptions.RequestException as e:
         # Handle network-level errors (e.g., cannot connect to the API)
-        print(f"Network error calling Gemini API: {e}")
+        logger.error("Network error calling Gemini API: %s", e)
         return jsonify({'error': 'Failed to connect to the sentiment analysis service'}), 500
 
 # This allows you to run the server directly using "python app.py"
 if __name__ == '__main__':
-    # Runs the app on localhost, port 5000, with debugging features enabled.
-    app.run(port=5000, debug=True)
+    # Development server only; use "gunicorn -c gunicorn_conf.py app:app" in production.
+    app.run(port=5000)
 
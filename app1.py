@@ -1,110 +1,553 @@
+import asyncio
+import logging
 import os
-import requests
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import re
+import threading
+import httpx
+import msgspec
+import orjson
+import redis
+import redis.asyncio as aioredis
+from quart import Quart, Response, request, jsonify
+from quart_cors import cors
 from dotenv import load_dotenv
 
+import fast_sentiment
+from circuit_breaker import CircuitOpenError
+from gemini import (
+    GEMINI_BREAKER,
+    REDIS_POOL_OPTIONS,
+    SENTIMENT_CACHE_SIZE,
+    SENTIMENT_CACHE_TTL,
+    LRUCache,
+    gemini_body,
+    record_status,
+    reply_text,
+    sentiment_cache_key,
+    system_instruction,
+)
+from json_provider import OrjsonProvider
+from log_queue import setup_logging, truncate
+from schemas import ChatRequest, SentimentRequest, decode_request
+
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # the semantic cache is optional
+    SentenceTransformer = None
+
 # Load environment variables from the .env file
 load_dotenv()
 
-# Initialize the Flask application
-app = Flask(__name__)
+# Log through a background queue so writing logs never blocks the event loop
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Initialize the Quart application (async Flask) so a worker is not blocked
+# while it waits on Gemini
+app = Quart(__name__)
+# Use orjson for jsonify() and request.get_json()
+app.json = OrjsonProvider(app)
 # Enable Cross-Origin Resource Sharing (CORS) to allow frontend requests
-CORS(app)
+app = cors(app)
 
 # --- Configuration based on debugging session ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-# Using the final, correct endpoint and model from the debug session
-GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={GEMINI_API_KEY}"
+# Using the final, correct endpoint and model from the debug session. The
+# client sends the key as a header (see start_client), so the URLs hold no secret.
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+# Same model, streamed back as Server-Sent Events while it is being generated
+GEMINI_STREAM_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:streamGenerateContent?alt=sse"
+# No API key means mock mode: every route answers locally for testing
+MOCK_MODE = not GEMINI_API_KEY
+# Word that makes a mock sentiment "happy"
+MOCK_HAPPY_RE = re.compile(r"\bgood\b", re.IGNORECASE)
+
+# Timeouts in seconds for calls to the Gemini API
+GEMINI_TIMEOUT = httpx.Timeout(30.0, connect=3.05)
+# A single HTTP/2 client multiplexes concurrent Gemini calls over one pooled
+# connection. It is created once the event loop is running, see start_client().
+CLIENT = None
+
+# A simple system prompt for the chat AI
+CHAT_PROMPT = "You are a friendly and supportive AI assistant. Keep your responses concise and encouraging."
+
+# System prompt to ensure a clean, single-word sentiment response
+SENTIMENT_PROMPT = 'You are a highly specialized sentiment analysis model. Your only function is to analyze the following text and classify its dominant emotion as either "happy" or "sad". Your response MUST be a single word, with no extra formatting, punctuation, or explanation. The only valid responses are the literal strings "happy" or "sad".'
+
+# System prompt used when several sentiment requests are classified in one call
+BATCH_SENTIMENT_PROMPT = 'You are a highly specialized sentiment analysis model. You will receive a JSON array of objects, each with a numeric "id" and a "text". Classify the dominant emotion of each text as either "happy" or "sad". Your response MUST contain exactly one line per object, in the form "<id>: happy" or "<id>: sad", with no other formatting, punctuation, or explanation.'
+# One "<id>: <label>" line of a batched sentiment reply
+BATCH_REPLY_RE = re.compile(r"^\s*(\d+)\s*:\s*(happy|sad)\s*$", re.IGNORECASE | re.MULTILINE)
+
+# Each prompt's systemInstruction block is serialized once, at import
+CHAT_INSTRUCTION = system_instruction(CHAT_PROMPT)
+SENTIMENT_INSTRUCTION = system_instruction(SENTIMENT_PROMPT)
+BATCH_SENTIMENT_INSTRUCTION = system_instruction(BATCH_SENTIMENT_PROMPT)
+
+
+# --- Sentiment cache ---
+# Set REDIS_HOST to share cached sentiments between workers and replicas
+_local_sentiments = LRUCache(SENTIMENT_CACHE_SIZE)
+
+REDIS_HOST = os.getenv("REDIS_HOST")
+# Hundreds of requests can be in flight at once, so a request that finds all
+# connections busy waits briefly for one instead of failing straight away
+REDIS = aioredis.Redis.from_pool(aioredis.BlockingConnectionPool(
+    host=REDIS_HOST,
+    port=int(os.getenv("REDIS_PORT", "6379")),
+    timeout=0.2,
+    **REDIS_POOL_OPTIONS,
+)) if REDIS_HOST else None
+
+
+async def _get_cached_sentiment(key):
+    """Returns the cached sentiment for a key, or None on a miss."""
+    sentiment = _local_sentiments.get(key)
+    if sentiment is not None or REDIS is None:
+        return sentiment
+
+    try:
+        sentiment = await REDIS.get(key)
+    except redis.RedisError as e:
+        # The shared cache is an optimization, never fail the request over it
+        logger.error("Redis error reading the sentiment cache: %s", e)
+        return None
+    if sentiment is not None:
+        _local_sentiments.set(key, sentiment)
+    return sentiment
+
+
+async def _cache_sentiment(key, sentiment):
+    """Stores a sentiment in this worker's cache and in Redis."""
+    _local_sentiments.set(key, sentiment)
+    if REDIS is None:
+        return
+
+    try:
+        await REDIS.setex(key, SENTIMENT_CACHE_TTL, sentiment)
+    except redis.RedisError as e:
+        logger.error("Redis error writing the sentiment cache: %s", e)
+
+
+# --- Semantic cache ---
+# Paraphrases like "I feel great" and "I'm feeling great" should not cost a
+# second Gemini call. Messages are embedded with a small local model and a
+# cached response is reused when its message is similar enough.
+# Install sentence-transformers to enable it; without it only the exact
+# match cache above is used.
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_SIZE = 10000
+
+EMBEDDER = SentenceTransformer("all-MiniLM-L6-v2") if SentenceTransformer else None
+
+
+class SemanticCache:
+    """Nearest-neighbour cache of responses keyed by normalized message embeddings."""
+
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_SIZE):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # Fixed-size ring buffer: once full, each insert overwrites the oldest
+        # entry in place instead of copying the whole matrix
+        self._embeddings = np.zeros((max_entries, EMBEDDER.get_sentence_embedding_dimension()), dtype=np.float32)
+        self._responses = [None] * max_entries
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def get(self, embedding):
+        """Returns the response of the most similar cached message, or None."""
+        with self._lock:
+            if self._size == 0:
+                return None
+            # Embeddings are unit length, so the dot product is the cosine similarity
+            similarities = self._embeddings[:self._size] @ embedding
+            best = int(similarities.argmax())
+            if similarities[best] >= self.threshold:
+                return self._responses[best]
+        return None
+
+    def add(self, embedding, response):
+        """Stores a response, dropping the oldest entry once the cache is full."""
+        with self._lock:
+            self._embeddings[self._next] = embedding
+            self._responses[self._next] = response
+            self._next = (self._next + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+
+
+    def lookup(self, message):
+        """Embeds a message and returns (embedding, response of the most similar cached message or None)."""
+        embedding = EMBEDDER.encode([message], normalize_embeddings=True)[0]
+        return embedding, self.get(embedding)
+
+
+# Encoding and the similarity search are CPU-bound and the cache lock can be
+# held by a worker thread, so the event loop only ever awaits cache access.
+async def _semantic_lookup(cache, message):
+    """Returns (embedding, cached response) for a message, or (None, None) if the semantic cache is disabled."""
+    if cache is None:
+        return None, None
+    return await asyncio.to_thread(cache.lookup, message)
+
+
+async def _semantic_add(cache, embedding, response):
+    """Stores a response in a semantic cache without blocking the event loop."""
+    await asyncio.to_thread(cache.add, embedding, response)
+
+
+# Kept separate so a chat reply can never be served as a sentiment and vice versa
+SENTIMENT_SEMANTIC_CACHE = SemanticCache() if EMBEDDER else None
+CHAT_SEMANTIC_CACHE = SemanticCache() if EMBEDDER else None
+
+
+# --- Sentiment batching ---
+# Sentiment requests that arrive within a short window are classified with a
+# single Gemini call, so the system prompt and the round-trip are paid once
+# per batch instead of once per request.
+SENTIMENT_BATCH_SIZE = 32
+SENTIMENT_BATCH_WINDOW = 0.02  # seconds
+# Holds (message, future) pairs; created once the event loop is running
+SENTIMENT_QUEUE = None
+_batcher_task = None
+_batch_tasks = set()
+
+
+async def _call_gemini(message, instruction):
+    """Sends a message with a pre-serialized system instruction and returns Gemini's reply text."""
+    GEMINI_BREAKER.before_call()
+    try:
+        response = await CLIENT.post(GEMINI_API_URL, content=gemini_body(message, instruction))
+    except httpx.RequestError:
+        GEMINI_BREAKER.record_failure()
+        raise
+    except BaseException:
+        # Cancelled before Gemini answered, so there is no outcome to count
+        GEMINI_BREAKER.release()
+        raise
+    record_status(response.status_code)
+    response.raise_for_status()
+    return reply_text(response.content)
+
+
+async def _classify_batch(messages):
+    """
+    Classifies several messages, returning one sentiment (or the exception
+    raised for it) per message, in order.
+    """
+    sentiments = [None] * len(messages)
+    if len(messages) > 1:
+        # JSON-encoding the texts keeps user content from breaking the list
+        # apart, and answers are matched by id rather than by position
+        batch = orjson.dumps([{"id": i, "text": message} for i, message in enumerate(messages)]).decode()
+        text = await _call_gemini(batch, BATCH_SENTIMENT_INSTRUCTION)
+        answers = {}
+        for index, label in BATCH_REPLY_RE.findall(text):
+            answers.setdefault(int(index), set()).add(label.lower())
+        for index, labels in answers.items():
+            # Ignore unknown ids and ids that were given conflicting answers
+            if index < len(messages) and len(labels) == 1:
+                sentiments[index] = labels.pop()
+
+    missing = [i for i, sentiment in enumerate(sentiments) if sentiment is None]
+    if missing and len(messages) > 1:
+        logger.warning("Batched sentiment reply had no usable answer for %d of %d messages, classifying those one by one.", len(missing), len(messages))
+
+    results = await asyncio.gather(
+        *(_call_gemini(messages[i], SENTIMENT_INSTRUCTION) for i in missing),
+        return_exceptions=True,
+    )
+    for i, result in zip(missing, results):
+        sentiments[i] = result if isinstance(result, BaseException) else result.strip().lower()
+    return sentiments
+
+
+async def _resolve_batch(batch):
+    """Classifies a batch and hands each result to the request waiting on it."""
+    try:
+        results = await _classify_batch([message for message, _ in batch])
+    except Exception as e:
+        results = [e] * len(batch)
+
+    for (_, future), result in zip(batch, results):
+        if future.done():
+            continue
+        if isinstance(result, BaseException):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+
+async def _sentiment_batcher():
+    """Collects queued sentiment requests into batches and dispatches them."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await SENTIMENT_QUEUE.get()]
+        deadline = loop.time() + SENTIMENT_BATCH_WINDOW
+        while len(batch) < SENTIMENT_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(SENTIMENT_QUEUE.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Resolve in the background so the next batch can start collecting
+        task = asyncio.create_task(_resolve_batch(batch))
+        _batch_tasks.add(task)
+        task.add_done_callback(_batch_tasks.discard)
+
+
+async def _classify_sentiment(message):
+    """Queues a message for batched classification and waits for its sentiment."""
+    future = asyncio.get_running_loop().create_future()
+    await SENTIMENT_QUEUE.put((message, future))
+    return await future
+
+
+# --- In-flight deduplication ---
+# Concurrent requests for the same uncached message share one classification
+# instead of each sending their own. Everything runs on the event loop, so
+# the dict needs no lock.
+_inflight_sentiments = {}
+
+
+async def _classify_and_cache(cache_key, message, embedding):
+    """Classifies a message and stores a well-formed answer in the caches."""
+    sentiment = await _classify_sentiment(message)
+    if sentiment in ("happy", "sad"):
+        await _cache_sentiment(cache_key, sentiment)
+        if embedding is not None:
+            await _semantic_add(SENTIMENT_SEMANTIC_CACHE, embedding, sentiment)
+    return sentiment
+
+
+async def _classify_once(cache_key, message, embedding):
+    """Joins the in-flight classification for this key, starting one if there is none."""
+    task = _inflight_sentiments.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_classify_and_cache(cache_key, message, embedding))
+        _inflight_sentiments[cache_key] = task
+        task.add_done_callback(lambda _: _inflight_sentiments.pop(cache_key, None))
+    # Shielded so one client disconnecting does not cancel the call for the others
+    return await asyncio.shield(task)
+
+
+@app.before_serving
+async def start_client():
+    """Opens the shared Gemini client and starts the sentiment batcher."""
+    global CLIENT, SENTIMENT_QUEUE, _batcher_task
+    CLIENT = httpx.AsyncClient(
+        headers={"Content-Type": "application/json", "x-goog-api-key": GEMINI_API_KEY or ""},
+        timeout=GEMINI_TIMEOUT,
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=100, keepalive_expiry=60),
+            retries=3,
+        ),
+    )
+    SENTIMENT_QUEUE = asyncio.Queue()
+    _batcher_task = asyncio.create_task(_sentiment_batcher())
+
+
+@app.after_serving
+async def close_client():
+    """Stops the sentiment batcher and closes the shared Gemini client."""
+    _batcher_task.cancel()
+    # Let batches that are already in flight finish before their client goes away
+    await asyncio.gather(_batcher_task, *_batch_tasks, return_exceptions=True)
+    await CLIENT.aclose()
+    if REDIS is not None:
+        await REDIS.aclose()
 
 
 @app.route("/")
-def home():
+async def home():
     """Provides a simple status check for the API."""
-    return "✅ Sentiment and Chat API is running. Use POST /api/sentiment and POST /api/chat."
+    return "✅ Sentiment and Chat API is running. Use POST /api/sentiment, POST /api/chat and POST /api/chat/stream."
 
 
 @app.route('/api/sentiment', methods=['POST'])
-def get_sentiment_route():
+async def get_sentiment_route():
     """Analyzes the sentiment of a message using the Gemini API."""
     
-    if not GEMINI_API_KEY:
-        print("Warning: API key not found. Returning a mock sentiment.")
-        sentiment = "happy" if "good" in request.get_json().get('message', '').lower() else "sad"
+    if MOCK_MODE:
+        logger.warning("API key not found. Returning a mock sentiment.")
+        sentiment = "happy" if MOCK_HAPPY_RE.search((await request.get_json()).get('message', '')) else "sad"
         return jsonify({'sentiment': sentiment})
 
-    data = request.get_json()
-    message = data.get('message')
+    try:
+        req = decode_request(await request.get_data(), SentimentRequest)
+    except msgspec.DecodeError:
+        return jsonify({'error': 'Message is required'}), 400
+    message = req.message
 
     if not message:
         return jsonify({'error': 'Message is required'}), 400
 
-    # System prompt to ensure a clean, single-word response
-    system_prompt = 'You are a highly specialized sentiment analysis model. Your only function is to analyze the following text and classify its dominant emotion as either "happy" or "sad". Your response MUST be a single word, with no extra formatting, punctuation, or explanation. The only valid responses are the literal strings "happy" or "sad".'
+    # Obvious cases are answered locally without a Gemini call
+    sentiment = fast_sentiment.classify(message)
+    if sentiment is not None:
+        return jsonify({'sentiment': sentiment})
 
-    try:
-        payload = {
-            "contents": [{"parts": [{"text": message}]}],
-            "systemInstruction": {"parts": [{"text": system_prompt}]}
-        }
-        
-        response = requests.post(GEMINI_API_URL, json=payload)
-        response.raise_for_status()
+    cache_key = sentiment_cache_key(SENTIMENT_PROMPT, message)
+    sentiment = await _get_cached_sentiment(cache_key)
+    if sentiment is not None:
+        return jsonify({'sentiment': sentiment})
 
-        response_data = response.json()
-        sentiment = response_data['candidates'][0]['content']['parts'][0]['text'].strip().lower()
+    # Negated messages skip the semantic cache in both directions: "not
+    # unhappy" embeds close to "not happy" but means the opposite
+    embedding = None
+    if not fast_sentiment.has_negation(message):
+        embedding, sentiment = await _semantic_lookup(SENTIMENT_SEMANTIC_CACHE, message)
+        # A paraphrase match is only a guess for this exact message, so it is
+        # returned but never stored under this message's exact-match key
+        if sentiment is not None:
+            return jsonify({'sentiment': sentiment})
 
+    try:
+        sentiment = await _classify_once(cache_key, message, embedding)
         return jsonify({'sentiment': sentiment})
 
-    except requests.exceptions.HTTPError as e:
-        print(f"HTTP Error calling Gemini API: {e.response.text}")
+    except CircuitOpenError:
+        # Gemini keeps failing, answer right away with a neutral fallback
+        return jsonify({'error': 'The sentiment analysis service is temporarily unavailable', 'sentiment': 'happy'}), 503
+    except httpx.HTTPStatusError as e:
+        logger.error("HTTP Error calling Gemini API: %s", truncate(e.response.text))
         return jsonify({'error': f'API request failed with status {e.response.status_code}'}), e.response.status_code
-    except (KeyError, IndexError):
-        print(f"Error parsing Gemini API response: {response.json()}")
+    except (KeyError, IndexError, orjson.JSONDecodeError) as e:
+        logger.error("Error parsing Gemini API response: %r", e)
         return jsonify({'error': 'Invalid response structure from sentiment service'}), 500
-    except requests.exceptions.RequestException as e:
-        print(f"Network error calling Gemini API: {e}")
+    except httpx.RequestError as e:
+        logger.error("Network error calling Gemini API: %s", e)
         return jsonify({'error': 'Failed to connect to the sentiment analysis service'}), 500
 
 
 # --- NEW CHAT ENDPOINT ---
 @app.route('/api/chat', methods=['POST'])
-def continue_chat_route():
+async def continue_chat_route():
     """Handles general conversational messages with the AI."""
     
-    if not GEMINI_API_KEY:
+    if MOCK_MODE:
         return jsonify({'response': "I'm in offline mode right now, but we can chat more later!"})
 
-    data = request.get_json()
-    message = data.get('message')
+    try:
+        req = decode_request(await request.get_data(), ChatRequest)
+    except msgspec.DecodeError:
+        return jsonify({'error': 'Message is required'}), 400
+    message = req.message
 
     if not message:
         return jsonify({'error': 'Message is required'}), 400
 
-    # A simple system prompt for the chat AI
-    system_prompt = "You are a friendly and supportive AI assistant. Keep your responses concise and encouraging."
+    embedding, ai_response = await _semantic_lookup(CHAT_SEMANTIC_CACHE, message)
+    if ai_response is not None:
+        return jsonify({'response': ai_response})
 
     try:
-        payload = {
-            "contents": [{"parts": [{"text": message}]}],
-            "systemInstruction": {"parts": [{"text": system_prompt}]}
-        }
-        
-        response = requests.post(GEMINI_API_URL, json=payload)
-        response.raise_for_status()
-
-        response_data = response.json()
-        ai_response = response_data['candidates'][0]['content']['parts'][0]['text'].strip()
+        ai_response = (await _call_gemini(message, CHAT_INSTRUCTION)).strip()
+        if embedding is not None:
+            await _semantic_add(CHAT_SEMANTIC_CACHE, embedding, ai_response)
 
         return jsonify({'response': ai_response})
 
-    except requests.exceptions.HTTPError as e:
-        print(f"HTTP Error in chat: {e.response.text}")
+    except CircuitOpenError:
+        return jsonify({'error': 'The chat service is currently unavailable.'}), 503
+    except httpx.HTTPStatusError as e:
+        logger.error("HTTP Error in chat: %s", truncate(e.response.text))
         return jsonify({'error': 'The chat service is currently unavailable.'}), e.response.status_code
     except Exception as e:
-        print(f"An unexpected error occurred in chat: {e}")
+        logger.error("An unexpected error occurred in chat: %s", e)
         return jsonify({'error': 'An unexpected error occurred.'}), 500
 
 
+@app.route('/api/chat/stream', methods=['POST'])
+async def stream_chat_route():
+    """
+    Streams the chat reply as Server-Sent Events while Gemini generates it.
+    Each event carries a JSON object with the next piece of text, so the
+    frontend can render the reply before it is complete.
+    """
+    if MOCK_MODE:
+        return Response(_sse_event({'text': "I'm in offline mode right now, but we can chat more later!"}), mimetype='text/event-stream')
+
+    try:
+        req = decode_request(await request.get_data(), ChatRequest)
+    except msgspec.DecodeError:
+        return jsonify({'error': 'Message is required'}), 400
+    message = req.message
+
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+
+    embedding, ai_response = await _semantic_lookup(CHAT_SEMANTIC_CACHE, message)
+    if ai_response is not None:
+        return Response(_sse_event({'text': ai_response}), mimetype='text/event-stream')
+
+    try:
+        GEMINI_BREAKER.before_call()
+    except CircuitOpenError:
+        return jsonify({'error': 'The chat service is currently unavailable.'}), 503
+
+    body = gemini_body(message, CHAT_INSTRUCTION)
+
+    async def generate():
+        chunks = []
+        settled = False
+        try:
+            # Leaving the block closes the response and returns the connection to the pool
+            async with CLIENT.stream("POST", GEMINI_STREAM_URL, content=body) as response:
+                # The status line settles the breaker call, whatever the body does later
+                record_status(response.status_code)
+                settled = True
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    text = _text_delta(line[6:])
+                    if text:
+                        chunks.append(text)
+                        yield _sse_event({'text': text})
+        except httpx.HTTPStatusError as e:
+            logger.error("HTTP Error in chat stream: %s", e.response.status_code)
+            yield _sse_event({'error': 'The chat service is currently unavailable.'})
+            return
+        except httpx.HTTPError as e:
+            GEMINI_BREAKER.record_failure()
+            logger.error("Network error in chat stream: %s", e)
+            yield _sse_event({'error': 'An unexpected error occurred.'})
+            return
+        except BaseException:
+            # The client went away before Gemini answered, so there is no outcome to count
+            if not settled:
+                GEMINI_BREAKER.release()
+            raise
+
+        if embedding is not None and chunks:
+            await _semantic_add(CHAT_SEMANTIC_CACHE, embedding, "".join(chunks).strip())
+
+    return Response(generate(), mimetype='text/event-stream')
+
+
+def _sse_event(data):
+    """Formats a dict as a single Server-Sent Event."""
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+def _text_delta(chunk):
+    """Extracts the text from one streamed Gemini chunk, or "" if it has none."""
+    try:
+        parts = orjson.loads(chunk)['candidates'][0]['content']['parts']
+    except (ValueError, KeyError, IndexError):
+        return ""
+    return "".join(part.get('text', '') for part in parts)
+
+
 if __name__ == '__main__':
-    app.run(port=5000, debug=True)
+    # uvicorn[standard] brings uvloop and httptools, which uvicorn picks up
+    # automatically in place of the default asyncio loop and HTTP parser.
+    # In production run "uvicorn app1:app --workers 4" instead.
+    import uvicorn
+    uvicorn.run(app, port=5000)
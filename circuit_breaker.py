@@ -0,0 +1,65 @@
+"""
+Minimal circuit breaker for calls to the Gemini API.
+
+After fail_max consecutive failures (timeouts, connection errors or 5xx
+responses) the circuit opens and calls fail immediately with
+CircuitOpenError instead of tying up a worker on a struggling upstream.
+Once reset_timeout seconds have passed, a single trial call is let through
+while every other caller keeps failing fast. If the trial succeeds the
+circuit closes, if it fails the circuit opens for another cooldown.
+
+Every call admitted by before_call() must report back with
+record_success(), record_failure() or, when its outcome says nothing about
+the upstream's health (a 4xx reply, a cancelled call), release().
+
+The breaker only records outcomes, it never makes the call itself, so the
+same object works for blocking and async code alike.
+"""
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the circuit is open."""
+
+
+class CircuitBreaker:
+    """Tracks consecutive failures of an upstream service and fails fast while it is down."""
+
+    def __init__(self, fail_max=5, reset_timeout=30):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises CircuitOpenError if the circuit is open and still cooling down."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._trial_in_flight or time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("Upstream service is unavailable, failing fast")
+            # Half-open: this call is the trial, everyone else waits for its outcome
+            self._trial_in_flight = True
+
+    def record_success(self):
+        """Closes the circuit after a successful call."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Counts a failed call, opening the circuit once fail_max is reached."""
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """Ends a call without counting it, letting the next caller run the trial if this one was it."""
+        with self._lock:
+            self._trial_in_flight = False
@@ -0,0 +1,65 @@
+"""
+Keyword pre-classifier for messages whose sentiment is obvious.
+
+Messages that only contain clearly happy or clearly sad words are classified
+locally, so they never need a Gemini call. Anything ambiguous (both kinds of
+words, none at all, or a negation like "not happy") returns None and is left
+to the model.
+"""
+import re
+
+HAPPY_WORDS = frozenset({
+    "happy", "glad", "great", "awesome", "amazing", "wonderful", "fantastic",
+    "excellent", "love", "loved", "loving", "joy", "joyful", "excited",
+    "delighted", "thrilled", "grateful", "thankful", "thanks", "cheerful",
+    "yay", "blessed", "proud", "overjoyed", "ecstatic",
+})
+
+SAD_WORDS = frozenset({
+    "sad", "unhappy", "terrible", "awful", "horrible", "hate", "hated",
+    "miserable", "depressed", "depressing", "lonely", "heartbroken", "upset",
+    "crying", "cried", "grief", "grieving", "hopeless", "devastated",
+    "gloomy", "sorrow", "disappointed", "hurt", "worst", "tears",
+})
+
+# Words that can flip the meaning of a sentiment word ("not happy", "never sad")
+NEGATIONS = frozenset({
+    "not", "no", "never", "nothing", "nobody", "none", "neither", "nor",
+    "without", "hardly", "barely", "cannot",
+    # Contractions typed without the apostrophe
+    "dont", "didnt", "doesnt", "isnt", "arent", "wasnt", "werent", "cant",
+    "couldnt", "wont", "wouldnt", "shouldnt", "havent", "hasnt", "hadnt",
+    "aint",
+})
+
+_WORD_RE = re.compile(r"[a-z']+")
+# Typographic apostrophes (the default on many phone keyboards) become "'"
+_APOSTROPHES = str.maketrans({"\u2019": "'", "\u2018": "'"})
+
+
+def _words(message):
+    """Returns the set of lowercase words in a message."""
+    return set(_WORD_RE.findall(message.lower().translate(_APOSTROPHES)))
+
+
+def _is_negated(words):
+    """Returns True if any of the words is a negation."""
+    return not words.isdisjoint(NEGATIONS) or any(word.endswith("n't") for word in words)
+
+
+def has_negation(message):
+    """Returns True if the message contains a word that can flip its sentiment."""
+    return _is_negated(_words(message))
+
+
+def classify(message):
+    """Returns "happy" or "sad" when the message is unambiguous, otherwise None."""
+    words = _words(message)
+    if _is_negated(words):
+        return None
+
+    is_happy = not HAPPY_WORDS.isdisjoint(words)
+    is_sad = not SAD_WORDS.isdisjoint(words)
+    if is_happy == is_sad:
+        return None
+    return "happy" if is_happy else "sad"
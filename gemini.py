@@ -0,0 +1,147 @@
+"""
+Gemini plumbing shared by app.py, app1.py and main.py.
+
+Request bodies, reply parsing, sentiment cache keys and the per-worker LRU
+live here so every app uses the same hot path. Each app keeps only its own
+call wrapper, because app.py and main.py are blocking Flask apps on requests
+while app1.py is an async Quart app on httpx.
+"""
+import re
+import threading
+from collections import OrderedDict
+from hashlib import sha256
+
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from circuit_breaker import CircuitBreaker
+
+# (connect, read) timeouts in seconds for blocking calls to the Gemini API
+REQUEST_TIMEOUT = (3.05, 30)
+
+# One breaker per process: each process serves a single app, and every
+# Gemini call it makes goes through this breaker (see circuit_breaker.py)
+GEMINI_BREAKER = CircuitBreaker(fail_max=5, reset_timeout=30)
+
+# --- Sentiment cache ---
+# Classifying the same text always yields the same answer, so results are
+# remembered and repeated messages skip the Gemini round-trip. Each worker
+# keeps an LRUCache in front of an optional Redis cache that is shared by
+# every worker and replica.
+SENTIMENT_CACHE_SIZE = 10000
+SENTIMENT_CACHE_TTL = 86400  # seconds
+
+# Connection pool settings for the shared Redis cache. Redis is only a
+# cache, so short socket timeouts turn a hung or unreachable server into a
+# quick miss instead of a stuck request.
+REDIS_POOL_OPTIONS = {
+    "max_connections": 64,
+    "socket_connect_timeout": 0.2,
+    "socket_timeout": 0.2,
+    "decode_responses": True,
+}
+
+# Matches the first candidate's text in a raw Gemini response, so replies
+# can be read without parsing the whole JSON document. The string pattern is
+# written as runs of plain characters between escapes so long replies are
+# scanned quickly.
+REPLY_TEXT_RE = re.compile(rb'"parts"\s*:\s*\[\s*\{\s*"text"\s*:\s*"([^"\\]*(?:\\.[^"\\]*)*)"')
+
+
+def new_session(headers):
+    """
+    Returns a pooled requests session for Gemini calls. Reusing it lets warm
+    requests skip the TCP + TLS handshake, and worker threads can share it.
+    """
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json", **headers})
+    session.mount("https://", HTTPAdapter(
+        pool_connections=50,
+        pool_maxsize=50,
+        # Retry failed connects and 429/5xx replies, but never re-send a request
+        # that timed out while reading. Gemini calls are POSTs, which urllib3 only
+        # retries on status when allowed explicitly; raise_on_status=False returns
+        # the last 429/5xx reply so it is still reported as an HTTP error.
+        max_retries=Retry(
+            total=3,
+            connect=2,
+            read=0,
+            backoff_factor=0.2,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset({"POST"}),
+            raise_on_status=False,
+        ),
+    ))
+    return session
+
+
+def record_status(status_code):
+    """
+    Reports the HTTP status of a Gemini reply to GEMINI_BREAKER, so every app
+    classifies replies the same way. 5xx counts as a failure and 2xx/3xx as a
+    success. A 4xx (429 included) is about the request rather than Gemini's
+    health, so it is not counted and only releases the call.
+    """
+    if status_code >= 500:
+        GEMINI_BREAKER.record_failure()
+    elif status_code >= 400:
+        GEMINI_BREAKER.release()
+    else:
+        GEMINI_BREAKER.record_success()
+
+
+def system_instruction(prompt):
+    """Serializes a systemInstruction block. Apps call this once per prompt at import."""
+    return orjson.dumps({"parts": [{"text": prompt}]})
+
+
+def gemini_body(message, instruction):
+    """
+    Builds the JSON body the Gemini API expects around a pre-serialized
+    system instruction, so only the user's message is encoded per call.
+    """
+    return b'{"contents":[{"parts":[{"text":' + orjson.dumps(message) + b'}]}],"systemInstruction":' + instruction + b'}'
+
+
+def reply_text(content):
+    """
+    Returns the text of the first candidate in a raw Gemini response body.
+    Falls back to a full parse if the field is not where the regex expects it.
+    """
+    match = REPLY_TEXT_RE.search(content)
+    if match:
+        # Let orjson undo the JSON string escaping of just the captured value
+        return orjson.loads(b'"' + match.group(1) + b'"')
+    return orjson.loads(content)['candidates'][0]['content']['parts'][0]['text']
+
+
+def sentiment_cache_key(prompt, message):
+    """Builds the cache key (local and Redis) for a message classified with a prompt."""
+    return "sent:" + sha256((prompt + "\0" + message).encode()).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe mapping that evicts the least recently used entry once full."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the value for a key, or None on a miss."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Stores a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
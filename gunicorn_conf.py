@@ -0,0 +1,24 @@
+# Gunicorn settings for running the API in production.
+#
+# Run with:
+#     gunicorn -c gunicorn_conf.py app:app
+#
+# app1.py is an async (Quart) app and runs under uvicorn instead:
+#     uvicorn app1:app --workers 4
+#
+# Every request spends almost all of its time waiting on the Gemini API, so
+# threaded workers let many of those calls overlap instead of queueing
+# behind each other like they do on Flask's development server.
+import multiprocessing
+
+bind = "0.0.0.0:5000"
+
+workers = 2 * multiprocessing.cpu_count() + 1
+worker_class = "gthread"
+# Each worker has its own pooled SESSION (pool_maxsize=50), which is larger
+# than the thread count so threads never wait for a free connection.
+threads = 8
+
+# Gemini read timeout is 30 seconds, leave headroom on top of it
+timeout = 60
+keepalive = 5
@@ -0,0 +1,24 @@
+"""
+Flask/Quart JSON provider backed by orjson.
+
+jsonify() and request.get_json() go through the app's JSON provider, so
+installing this one makes every response and request body use orjson
+instead of the standard library json module.
+"""
+import orjson
+from flask.json.provider import JSONProvider
+
+
+class OrjsonProvider(JSONProvider):
+    """Serializes and parses JSON with orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand the encoded bytes straight to the response, skipping a decode
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
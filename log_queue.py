@@ -0,0 +1,41 @@
+"""
+Non-blocking logging for the API.
+
+Request handlers only put records on an in-memory queue; a background
+thread owned by a QueueListener does the actual (possibly blocking) write
+to stderr. A full stdout/stderr pipe under container logging therefore
+never stalls a request.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+
+# Longest upstream response body that is written to the log
+MAX_LOGGED_BODY = 512
+
+_listener = None
+
+
+def setup_logging(level=logging.INFO):
+    """Routes the root logger through a queue drained by a background thread."""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.Queue(-1)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(_listener.stop)
+
+
+def truncate(text, limit=MAX_LOGGED_BODY):
+    """Shortens a possibly large upstream body before it is logged."""
+    return text if len(text) <= limit else text[:limit] + "...[truncated]"
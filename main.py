@@ -1,17 +1,38 @@
 from flask import Flask, request, jsonify
+import msgspec
+import orjson
 import requests
 import os
 from dotenv import load_dotenv
 
+from circuit_breaker import CircuitOpenError
+from gemini import GEMINI_BREAKER, REQUEST_TIMEOUT, new_session, record_status
+from json_provider import OrjsonProvider
+from schemas import SentimentRequest, decode_request
+
 # Load environment variables from .env
 load_dotenv()
 
 app = Flask(__name__)
+# Use orjson for jsonify() and request.json
+app.json = OrjsonProvider(app)
 
 # API Key from .env file
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_ENDPOINT = "https://api.gemini-pro.ai/v1/chat/completions"
 
+SESSION = new_session({"Authorization": f"Bearer {GEMINI_API_KEY}"})
+
+SYSTEM_MESSAGE = "You are a sentiment classifier. Only answer 'happy' or 'sad'."
+# Everything in the request body except the user's message is fixed, so it is
+# encoded once here and each request only encodes its message
+BODY_PREFIX = (
+    b'{"model":"gemini-pro","messages":[{"role":"system","content":'
+    + orjson.dumps(SYSTEM_MESSAGE)
+    + b'},{"role":"user","content":'
+)
+BODY_SUFFIX = b'}],"max_tokens":5}'
+
 
 # Home route (to check if server is running)
 @app.route("/")
@@ -23,30 +44,31 @@ def home():
 @app.route("/sentiment", methods=["POST"])
 def get_sentiment():
     try:
-        data = request.json
-        user_message = data.get("message", "")
-
-        if not user_message:
-            return jsonify({"error": "No message provided"}), 400
-
-        # Call Gemini API
-        response = requests.post(
-            GEMINI_ENDPOINT,
-            headers={
-                "Authorization": f"Bearer {GEMINI_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "gemini-pro",
-                "messages": [
-                    {"role": "system", "content": "You are a sentiment classifier. Only answer 'happy' or 'sad'."},
-                    {"role": "user", "content": user_message}
-                ],
-                "max_tokens": 5
-            }
-        )
+        user_message = decode_request(request.get_data(), SentimentRequest).message
+    except msgspec.DecodeError:
+        user_message = ""
+
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
 
-        result = response.json()
+    try:
+        # Call Gemini API, unless it keeps failing and the breaker is open
+        GEMINI_BREAKER.before_call()
+        try:
+            response = SESSION.post(
+                GEMINI_ENDPOINT,
+                data=BODY_PREFIX + orjson.dumps(user_message) + BODY_SUFFIX,
+                timeout=REQUEST_TIMEOUT,
+            )
+        except requests.exceptions.RequestException:
+            GEMINI_BREAKER.record_failure()
+            raise
+        except BaseException:
+            GEMINI_BREAKER.release()
+            raise
+        record_status(response.status_code)
+
+        result = orjson.loads(response.content)
 
         # Extract sentiment safely
         sentiment = (
@@ -63,10 +85,13 @@ def get_sentiment():
 
         return jsonify({"sentiment": sentiment})
 
+    except CircuitOpenError as e:
+        return jsonify({"error": str(e), "sentiment": "happy"}), 503
     except Exception as e:
         return jsonify({"error": str(e), "sentiment": "happy"}), 500
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # Development server only; use "gunicorn -c gunicorn_conf.py main:app" in production.
+    app.run(host="0.0.0.0", port=5000)
 
@@ -0,0 +1,24 @@
+"""
+Request bodies accepted by the API.
+
+Bodies are decoded straight into these structs with msgspec, which parses
+and validates in one pass without building an intermediate dict. A body
+that is not JSON, is missing "message", or has a non-string "message"
+raises msgspec.DecodeError.
+"""
+import msgspec
+
+
+class SentimentRequest(msgspec.Struct):
+    """Body of a sentiment analysis request."""
+    message: str
+
+
+class ChatRequest(msgspec.Struct):
+    """Body of a chat request."""
+    message: str
+
+
+def decode_request(body, request_type):
+    """Decodes a raw JSON request body into the given struct type."""
+    return msgspec.json.decode(body, type=request_type)